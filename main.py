@@ -2,125 +2,583 @@ from __future__ import annotations
 from dotenv import load_dotenv
 load_dotenv()
 import argparse
+import asyncio
+import io
+import json
 import os
 import shutil
 import subprocess
-import tempfile
 import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Literal
-
-from openai import OpenAI
-from openai.types.chat import (
-    ChatCompletionSystemMessageParam,
-    ChatCompletionUserMessageParam,
-)
+from typing import TYPE_CHECKING, AsyncIterator, Literal
+
+try:
+    import numpy as np
+except ImportError:  # semantic cache tier is optional
+    np = None
+
+try:
+    import sounddevice as sd
+    import soundfile as sf
+except (ImportError, OSError):  # fall back to arecord if ALSA bindings are missing
+    sd = None
+    sf = None
+
+import httpx
+from openai import AsyncOpenAI
+
+if TYPE_CHECKING:  # typed dicts are hints only; skip the import at runtime
+    from openai.types.chat import (
+        ChatCompletionSystemMessageParam,
+        ChatCompletionUserMessageParam,
+    )
 
 #Environment Config
 CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
 TRANSCRIPTION_MODEL = os.getenv("OPENAI_STT_MODEL", "gpt-4o-mini-transcribe")
 RECORD_SECONDS = int(os.getenv("RECORD_SECONDS", "5"))
+SAMPLE_RATE = 16000
+STT_CHUNK_SECONDS = int(os.getenv("BMO_STT_CHUNK_SECONDS", "2"))
+EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+CACHE_DIR = Path.home() / ".cache" / "bmo"
+EXACT_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.93
+SILENCE_THRESHOLD_DB = -40.0
+REQUESTS_PER_MINUTE = float(os.getenv("BMO_RPM", "500"))
+TOKENS_PER_MINUTE = float(os.getenv("BMO_TPM", "60000"))
+HISTORY_MAX_TURNS = 20
+
+# Built once at import; per-call paths only allocate the user message.
+_SYSTEM_MSG: ChatCompletionSystemMessageParam = {
+    "role": "system",
+    "content": (
+        "You are BMO, a friendly Raspberry Pi assistant. "
+        "Keep answers concise and practical."
+    ),
+}
+_BATCH_SYSTEM_MSG: ChatCompletionSystemMessageParam = {
+    "role": "system",
+    "content": (
+        "You are BMO, a friendly Raspberry Pi assistant. "
+        "Keep answers concise and practical. Answer each numbered "
+        "question independently and reply as a JSON object "
+        '{"answers": [...]} with one entry per question, in order.'
+    ),
+}
 
 
 #Audio Record
-def record_audio_wav(output_path: Path, duration_seconds: int) -> None:
-    """Record a mono 16kHz wav file using arecord (Linux / Raspberry Pi)."""
+def trim_silence(audio: "np.ndarray") -> "np.ndarray":
+    """Drop leading/trailing frames quieter than SILENCE_THRESHOLD_DB.
+
+    Works on 20 ms RMS windows; fewer bytes on the wire means less TLS and
+    HTTP transfer time on a slow Pi uplink.
+    """
+    frame = SAMPLE_RATE // 50  # 20 ms
+    samples = audio.reshape(-1).astype(np.float32) / 32768.0
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return audio
+
+    windows = samples[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(windows**2, axis=1))
+    db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    voiced = np.flatnonzero(db > SILENCE_THRESHOLD_DB)
+    if voiced.size == 0:
+        return audio[:0]
+
+    start = int(voiced[0]) * frame
+    end = min(len(audio), (int(voiced[-1]) + 1) * frame)
+    return audio[start:end]
+
+
+def flac_buffer(audio: "np.ndarray") -> io.BytesIO:
+    """Wrap captured samples in an in-memory FLAC (lossless, ~2x smaller than WAV)."""
+    buf = io.BytesIO()
+    sf.write(buf, audio, SAMPLE_RATE, format="FLAC")
+    buf.seek(0)
+    buf.name = "audio.flac"
+    return buf
+
+
+def record_audio_wav(duration_seconds: int) -> io.BytesIO:
+    """Record mono 16kHz WAV via arecord, captured from stdout into memory.
+
+    Piping to stdout keeps the audio off the SD card entirely (Linux /
+    Raspberry Pi fallback when sounddevice is unavailable).
+    """
     if shutil.which("arecord") is None:
         raise RuntimeError(
             "`arecord` not found. Install with: sudo apt install alsa-utils"
         )
 
-    subprocess.run(
+    proc = subprocess.Popen(
         [
             "arecord",
+            "-q",
             "-d", str(duration_seconds),
             "-f", "S16_LE",
-            "-r", "16000",
+            "-r", str(SAMPLE_RATE),
             "-c", "1",
-            str(output_path),
+            "-B", "100000",
+            "-t", "wav",
+            "-",
         ],
-        check=True,
+        stdout=subprocess.PIPE,
+        bufsize=1 << 16,
     )
+    data, _ = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"arecord exited with code {proc.returncode}")
+
+    buf = io.BytesIO(data)
+    buf.name = "speech.wav"
+    return buf
+
+
+#rate limiting
+class RateLimiter:
+    """Token-bucket admission control over requests- and tokens-per-minute.
+
+    Requests wait their turn up front instead of failing with 429 and
+    retrying, so rapid Send clicks queue smoothly.
+    """
+
+    def __init__(self, rpm: float, tpm: float) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = rpm
+        self._tokens = tpm
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    async def acquire(self, est_tokens: int = 0) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1.0 and self._tokens >= est_tokens:
+                    self._requests -= 1.0
+                    self._tokens -= est_tokens
+                    return
+                wait_requests = (1.0 - self._requests) * 60.0 / self.rpm
+                wait_tokens = (est_tokens - self._tokens) * 60.0 / self.tpm
+                await asyncio.sleep(max(wait_requests, wait_tokens, 0.01))
 
 
 #assistant
 class BMOAssistant:
-    def __init__(self, client: OpenAI) -> None:
+    def __init__(self, client: AsyncOpenAI) -> None:
         self.client = client
+        self.limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+        # Fixed leading tokens + accumulated turns let the server's prompt
+        # prefix cache reuse KV state across requests.
+        self.history: list = [_SYSTEM_MSG]
+        # Exact tier: LRU of normalized prompt -> response. Semantic tier:
+        # (embedding, response) pairs persisted across runs for near-matches.
+        self._exact_cache: OrderedDict[str, str] = OrderedDict()
+        self._semantic_cache: list[tuple[list[float], str]] = []
+        self._load_semantic_cache()
+
+    def _load_semantic_cache(self) -> None:
+        cache_file = CACHE_DIR / "cache.jsonl"
+        if np is None or not os.getenv("BMO_SEMANTIC_CACHE") or not cache_file.exists():
+            return
+        with cache_file.open() as handle:
+            for line in handle:
+                # Append-style writes can leave a truncated or malformed
+                # line behind if the process dies mid-write; skip those
+                # instead of failing every startup until the file is deleted.
+                try:
+                    entry = json.loads(line)
+                    self._semantic_cache.append((entry["embedding"], entry["response"]))
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+
+    def _save_semantic_entry(self, embedding: list[float], response: str) -> None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with (CACHE_DIR / "cache.jsonl").open("a") as handle:
+            handle.write(json.dumps({"embedding": embedding, "response": response}) + "\n")
+
+    def _exact_lookup(self, prompt_norm: str) -> str | None:
+        response = self._exact_cache.get(prompt_norm)
+        if response is not None:
+            self._exact_cache.move_to_end(prompt_norm)
+        return response
+
+    def _exact_store(self, prompt_norm: str, response: str) -> None:
+        self._exact_cache[prompt_norm] = response
+        self._exact_cache.move_to_end(prompt_norm)
+        while len(self._exact_cache) > EXACT_CACHE_SIZE:
+            self._exact_cache.popitem(last=False)
+
+    async def _embed(self, prompt: str) -> list[float] | None:
+        try:
+            result = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=prompt)
+        except Exception:
+            return None
+        return result.data[0].embedding
+
+    def _semantic_lookup(self, embedding: list[float]) -> str | None:
+        # Entries written under a different OPENAI_EMBEDDING_MODEL can have a
+        # different dimension; comparing against those would build a ragged
+        # array, so only same-sized vectors participate.
+        candidates = [
+            (vector, response)
+            for vector, response in self._semantic_cache
+            if len(vector) == len(embedding)
+        ]
+        if not candidates:
+            return None
+        matrix = np.array([vector for vector, _ in candidates])
+        query = np.array(embedding)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = matrix @ query / norms
+        best = int(similarities.argmax())
+        if similarities[best] > SEMANTIC_CACHE_THRESHOLD:
+            return candidates[best][1]
+        return None
+
+    async def ask_chatbot_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the reply token-by-token so callers can show output immediately."""
+        prompt_norm = prompt.strip().lower()
+
+        # Both tiers key on the prompt alone, which is only safe for the
+        # first turn: once history has context, a follow-up like "why?"
+        # would hit an answer from an unrelated conversation.
+        fresh = len(self.history) == 1
+        embedding: list[float] | None = None
+
+        if fresh:
+            cached = self._exact_lookup(prompt_norm)
+            if cached is not None:
+                self._remember_turn(prompt, cached)
+                yield cached
+                return
 
-    def ask_chatbot(self, prompt: str) -> str:
-        system_message: ChatCompletionSystemMessageParam = {
-            "role": "system",
-            "content": (
-                "You are BMO, a friendly Raspberry Pi assistant. "
-                "Keep answers concise and practical."
-            ),
-        }
-
-        user_message: ChatCompletionUserMessageParam = {
-            "role": "user",
-            "content": prompt,
-        }
-
-        response = self.client.chat.completions.create(
+            # The semantic tier costs a serial embeddings round-trip before
+            # the stream can start, so it is opt-in.
+            if np is not None and os.getenv("BMO_SEMANTIC_CACHE"):
+                embedding = await self._embed(prompt)
+            if embedding is not None:
+                cached = self._semantic_lookup(embedding)
+                if cached is not None:
+                    self._exact_store(prompt_norm, cached)
+                    self._remember_turn(prompt, cached)
+                    yield cached
+                    return
+
+        parts: list[str] = []
+        async for token in self._stream_completion(prompt):
+            parts.append(token)
+            yield token
+
+        if fresh:
+            response = "".join(parts).strip()
+            self._exact_store(prompt_norm, response)
+            if embedding is not None:
+                self._semantic_cache.append((embedding, response))
+                self._save_semantic_entry(embedding, response)
+
+    def _remember_turn(self, prompt: str, reply: str) -> None:
+        self.history.append({"role": "user", "content": prompt})
+        self.history.append({"role": "assistant", "content": reply})
+        self._trim_history()
+
+    def _trim_history(self) -> None:
+        # System message plus the last HISTORY_MAX_TURNS turns bounds token cost.
+        max_messages = 1 + 2 * HISTORY_MAX_TURNS
+        if len(self.history) > max_messages:
+            self.history = [self.history[0]] + self.history[-(max_messages - 1):]
+
+    def reset_history(self) -> None:
+        self.history = self.history[:1]
+
+    async def _stream_completion(self, prompt: str) -> AsyncIterator[str]:
+        await self.limiter.acquire(est_tokens=len(prompt) // 4 + 500)
+        stream = await self.client.chat.completions.create(
             model=CHAT_MODEL,
-            messages=[system_message, user_message],
+            messages=self.history + [{"role": "user", "content": prompt}],
+            stream=True,
         )
 
-        return (response.choices[0].message.content or "").strip()
+        parts: list[str] = []
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content or ""
+            parts.append(token)
+            yield token
+
+        # Record the turn only once the stream finished; a failure anywhere
+        # above must not leave a dangling user message that gets re-sent as
+        # context on every later turn.
+        self._remember_turn(prompt, "".join(parts).strip())
+
+    async def ask_chatbot(self, prompt: str) -> str:
+        """Non-streaming wrapper that collects the full reply.
+
+        Returns the joined stream as-is; display code strips once at render
+        instead of copying the whole string here.
+        """
+        return "".join([token async for token in self.ask_chatbot_stream(prompt)])
+
+    async def ask_chatbot_many(self, prompts: list[str]) -> list[str]:
+        """Answer several prompts in one request, saving a round-trip per extra prompt."""
+        if len(prompts) == 1:
+            return [await self.ask_chatbot(prompts[0])]
+
+        numbered = "\n".join(f"{i + 1}. {prompt}" for i, prompt in enumerate(prompts))
 
-    def transcribe_microphone(self, duration_seconds: int = RECORD_SECONDS) -> str:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_wav:
-            temp_path = Path(temp_wav.name)
+        await self.limiter.acquire(est_tokens=len(numbered) // 4 + 500 * len(prompts))
+        # Prior turns ride along so batched questions see the same context
+        # the single-prompt path would.
+        response = await self.client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[_BATCH_SYSTEM_MSG, *self.history[1:], {"role": "user", "content": numbered}],
+            response_format={"type": "json_object"},
+        )
 
         try:
-            record_audio_wav(temp_path, duration_seconds)
+            answers = json.loads(response.choices[0].message.content or "{}").get("answers", [])
+        except json.JSONDecodeError:
+            answers = []
+        if not isinstance(answers, list):
+            answers = []
+
+        # One answer per prompt, always: pad shortfalls with a visible
+        # placeholder rather than silently dropping questions in the GUI.
+        answers = [str(answer).strip() for answer in answers[: len(prompts)]]
+        answers += ["(no answer returned)"] * (len(prompts) - len(answers))
+
+        # Batched exchanges count as turns too, so follow-ups like "tell me
+        # more about the second one" keep their context.
+        for prompt, answer in zip(prompts, answers):
+            self._remember_turn(prompt, answer)
+        return answers
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client from inside its owning event loop.
+
+        Tearing connections down from another loop (e.g. atexit) raises
+        'Event loop is closed', so shutdown paths must call this before
+        their loop stops.
+        """
+        await self.client.close()
+
+    async def warm_up(self) -> None:
+        """Pay DNS + TLS + HTTP/2 handshake cost now, not on the first real request."""
+        try:
+            await self.client.models.list()
+        except Exception:
+            pass  # best-effort; the first request just handshakes itself
+
+    # Lazily-loaded faster-whisper model, shared across instances (optional
+    # dependency; only pulled in when BMO_LOCAL_STT is set).
+    _whisper_model = None
+
+    @classmethod
+    def _local_whisper(cls):
+        if cls._whisper_model is None:
+            from faster_whisper import WhisperModel
+
+            cls._whisper_model = WhisperModel("tiny.en", device="cpu", compute_type="int8")
+        return cls._whisper_model
+
+    def _transcribe_local(self, duration_seconds: int) -> str:
+        """Run STT on-device with int8 faster-whisper, skipping the network entirely."""
+        audio = sd.rec(
+            int(duration_seconds * SAMPLE_RATE),
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="int16",
+        )
+        sd.wait()
 
-            with temp_path.open("rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model=TRANSCRIPTION_MODEL,
-                    file=audio_file,
-                )
+        samples = audio.reshape(-1).astype(np.float32) / 32768.0
+        segments, _ = self._local_whisper().transcribe(samples, language="en")
+        return " ".join(segment.text.strip() for segment in segments).strip()
 
-            return transcript.text.strip()
+    async def _transcribe_chunk(self, audio: "np.ndarray") -> str:
+        audio = trim_silence(audio)
+        if len(audio) == 0:
+            return ""
 
-        finally:
-            temp_path.unlink(missing_ok=True)
+        await self.limiter.acquire(est_tokens=500)
+        transcript = await self.client.audio.transcriptions.create(
+            model=TRANSCRIPTION_MODEL,
+            file=flac_buffer(audio),
+        )
+        return transcript.text.strip()
+
+    async def _transcribe_overlapped(self, duration_seconds: int) -> str:
+        """Capture in 1 s blocks and upload earlier chunks while later ones record.
+
+        Hides network RTT behind capture time instead of waiting for the full
+        duration before the first byte goes out.
+        """
+        loop = asyncio.get_running_loop()
+        blocks: asyncio.Queue = asyncio.Queue()
+
+        def on_block(indata, frames, time_info, status) -> None:
+            loop.call_soon_threadsafe(blocks.put_nowait, indata.copy())
+
+        tasks: list[asyncio.Task[str]] = []
+        pending: list = []
+        stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="int16",
+            blocksize=SAMPLE_RATE,
+            callback=on_block,
+        )
+        with stream:
+            for _ in range(duration_seconds):
+                pending.append(await blocks.get())
+                if len(pending) >= STT_CHUNK_SECONDS:
+                    chunk = np.concatenate(pending)
+                    pending = []
+                    tasks.append(asyncio.create_task(self._transcribe_chunk(chunk)))
+
+        if pending:
+            tasks.append(asyncio.create_task(self._transcribe_chunk(np.concatenate(pending))))
+
+        texts = await asyncio.gather(*tasks)
+        return " ".join(text for text in texts if text).strip()
+
+    async def transcribe_microphone(self, duration_seconds: int = RECORD_SECONDS) -> str:
+        if os.getenv("BMO_LOCAL_STT") and sd is not None:
+            return await asyncio.to_thread(self._transcribe_local, duration_seconds)
+        if sd is not None:
+            return await self._transcribe_overlapped(duration_seconds)
+
+        buf = await asyncio.to_thread(record_audio_wav, duration_seconds)
+        await self.limiter.acquire(est_tokens=500)
+        transcript = await self.client.audio.transcriptions.create(
+            model=TRANSCRIPTION_MODEL,
+            file=buf,
+        )
+        return transcript.text.strip()
 
 
 #OPENAI check
-def require_openai_client() -> OpenAI:
+def require_openai_client() -> AsyncOpenAI:
     api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        return OpenAI(api_key=api_key)
-    raise RuntimeError("Set OPENAI_API_KEY first.")
+    if not api_key:
+        raise RuntimeError("Set OPENAI_API_KEY first.")
+
+    # HTTP/2 needs the optional h2 package (httpx[http2]); plain httpx as
+    # pulled in by openai ships without it, so fall back to HTTP/1.1
+    # keep-alive rather than crashing at startup.
+    try:
+        import h2  # noqa: F401
+
+        http2 = True
+    except ImportError:
+        http2 = False
+
+    # One keep-alive client for the whole session so TCP+TLS handshakes
+    # amortize across calls instead of paying a round-trip each request.
+    http_client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+    return AsyncOpenAI(api_key=api_key, http_client=http_client)
 
 
 #cli
-def run_cli(assistant: BMOAssistant) -> None:
-    print("=== BMO OpenAI Assistant (CLI) ===")
-    print("1) Text chatbot")
-    print("2) Speech-to-text + chatbot")
+async def ainput(prompt: str) -> str:
+    """Read a line of stdin without blocking the loop or gating Ctrl-C.
+
+    Uses a throwaway daemon thread instead of asyncio.to_thread: asyncio.run
+    joins the default executor on shutdown, so a blocked stdin read there
+    keeps Ctrl-C from exiting until the user also presses Enter. A daemon
+    thread just dies with the process.
+    """
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future[str] = loop.create_future()
+
+    def deliver(line: str | None, exc: BaseException | None) -> None:
+        if future.done():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(line)
+
+    def read() -> None:
+        try:
+            line = input(prompt)
+        except BaseException as exc:  # EOFError on closed stdin, mainly
+            line, error = None, exc
+        else:
+            error = None
+        try:
+            loop.call_soon_threadsafe(deliver, line, error)
+        except RuntimeError:
+            pass  # loop already gone; nothing left to deliver to
 
-    choice = input("Select mode (1/2): ").strip()
+    threading.Thread(target=read, daemon=True).start()
+    return await future
 
-    if choice == "1":
+
+async def run_cli(assistant: BMOAssistant) -> None:
+    # Handshake while the user reads the menu; input always runs off-loop
+    # so network tasks make progress during think-time.
+    asyncio.create_task(assistant.warm_up())
+
+    async def keep_alive() -> None:
         while True:
-            user_input = input("You: ").strip()
-            if user_input.lower() in {"quit", "exit", "q"}:
-                return
-            if not user_input:
-                continue
-            print(f"BMO: {assistant.ask_chatbot(user_input)}\n")
+            await asyncio.sleep(30)
+            await assistant.warm_up()
 
-    elif choice == "2":
-        print(f"Recording for {RECORD_SECONDS} seconds...")
-        spoken_text = assistant.transcribe_microphone()
-        print(f"You (speech): {spoken_text}")
-        print(f"BMO: {assistant.ask_chatbot(spoken_text)}")
+    keep_alive_task = asyncio.create_task(keep_alive())
 
-    else:
-        print("Invalid choice.")
+    print("=== BMO OpenAI Assistant (CLI) ===")
+    print("1) Text chatbot")
+    print("2) Speech-to-text + chatbot")
+
+    try:
+        choice = (await ainput("Select mode (1/2): ")).strip()
+
+        if choice == "1":
+            while True:
+                user_input = (await ainput("You: ")).strip()
+                if user_input.lower() in {"quit", "exit", "q"}:
+                    return
+                if user_input.lower() == "reset":
+                    assistant.reset_history()
+                    print("BMO: (history cleared)\n")
+                    continue
+                if not user_input:
+                    continue
+                print("BMO: ", end="", flush=True)
+                async for token in assistant.ask_chatbot_stream(user_input):
+                    print(token, end="", flush=True)
+                print("\n")
+
+        elif choice == "2":
+            print(f"Recording for {RECORD_SECONDS} seconds...")
+            spoken_text = await assistant.transcribe_microphone()
+            print(f"You (speech): {spoken_text}")
+            print("BMO: ", end="", flush=True)
+            async for token in assistant.ask_chatbot_stream(spoken_text):
+                print(token, end="", flush=True)
+            print()
+
+        else:
+            print("Invalid choice.")
+
+    finally:
+        keep_alive_task.cancel()
+        await assistant.aclose()
 
 
 #gui
@@ -133,6 +591,12 @@ def run_gui(assistant: BMOAssistant) -> None:
     root.title("BMO Assistant")
     root.geometry("900x520")
 
+    # One asyncio loop in a background thread; coroutines are submitted from
+    # Tk callbacks and marshal UI updates back through root.after.
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(assistant.warm_up(), loop)
+
     output = scrolledtext.ScrolledText(root, wrap="word", font=("Arial", 14))
     output.pack(fill="both", expand=True, padx=10, pady=10)
 
@@ -142,13 +606,32 @@ def run_gui(assistant: BMOAssistant) -> None:
     user_entry = tk.Entry(input_frame, font=("Arial", 14))
     user_entry.pack(side="left", fill="x", expand=True)
 
-    def ui(fn: Callable[[], None]) -> None:
-        # Keeps tkinter updates on the main thread and avoids PyCharm's after() typing noise
-        root.after(0, lambda: fn())
+    def ui(fn: Callable[..., None], *args) -> None:
+        # Keeps tkinter updates on the main thread; Tk's after() takes
+        # positional args directly, so no closure is allocated per call.
+        root.after(0, fn, *args)
+
+    # Streaming deltas land here (plain list.append is thread-safe under the
+    # GIL) and a single 50 ms timer flushes them, coalescing Tk redraws
+    # instead of forcing one per token.
+    pending_output: list[str] = []
+
+    def flush_output() -> None:
+        # Snapshot the length first: the asyncio thread may append while we
+        # drain, and clear() would silently drop anything that landed
+        # between the join and the clear.
+        n = len(pending_output)
+        if n:
+            output.insert("end", "".join(pending_output[:n]))
+            del pending_output[:n]
+            output.see("end")
+        root.after(50, flush_output)
 
     def append_line(text: str) -> None:
-        output.insert("end", text + "\n")
-        output.see("end")
+        pending_output.append(text.rstrip() + "\n")
+
+    def append_text(text: str) -> None:
+        pending_output.append(text)
 
     def set_enabled(enabled: bool) -> None:
         state = "normal" if enabled else "disabled"
@@ -156,6 +639,8 @@ def run_gui(assistant: BMOAssistant) -> None:
         send_button.configure(state=state)
         speak_button.configure(state=state)
 
+    pending_sends: list[str] = []
+
     def send_text() -> None:
         text = user_entry.get().strip()
         if not text:
@@ -163,35 +648,58 @@ def run_gui(assistant: BMOAssistant) -> None:
 
         append_line(f"You: {text}")
         user_entry.delete(0, "end")
+
+        # Coalesce submissions landing within 300 ms into one batched request.
+        # Only further text sends may join the window: a Speak worker started
+        # meanwhile would interleave its output with the batch reply.
+        pending_sends.append(text)
+        if len(pending_sends) == 1:
+            speak_button.configure(state="disabled")
+            root.after(300, dispatch_sends)
+
+    def dispatch_sends() -> None:
+        prompts = pending_sends[:]
+        pending_sends.clear()
+        if not prompts:
+            return
         set_enabled(False)
 
-        def worker() -> None:
+        async def worker() -> None:
             try:
-                reply = assistant.ask_chatbot(text)
-                ui(lambda: append_line(f"BMO: {reply}"))
+                if len(prompts) == 1:
+                    append_text("BMO: ")
+                    async for token in assistant.ask_chatbot_stream(prompts[0]):
+                        append_text(token)
+                    append_text("\n")
+                else:
+                    answers = await assistant.ask_chatbot_many(prompts)
+                    for answer in answers:
+                        append_line(f"BMO: {answer}")
             except Exception as exc:
-                ui(lambda: append_line(f"Error: {exc}"))
+                append_line(f"Error: {exc}")
             finally:
-                ui(lambda: set_enabled(True))
+                ui(set_enabled, True)
 
-        threading.Thread(target=worker, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(worker(), loop)
 
     def speak() -> None:
         set_enabled(False)
         append_line("BMO: Recording...")
 
-        def worker() -> None:
+        async def worker() -> None:
             try:
-                spoken = assistant.transcribe_microphone()
-                ui(lambda: append_line(f"You (speech): {spoken}"))
-                reply = assistant.ask_chatbot(spoken)
-                ui(lambda: append_line(f"BMO: {reply}"))
+                spoken = await assistant.transcribe_microphone()
+                append_line(f"You (speech): {spoken}")
+                append_text("BMO: ")
+                async for token in assistant.ask_chatbot_stream(spoken):
+                    append_text(token)
+                append_text("\n")
             except Exception as exc:
-                ui(lambda: append_line(f"Error: {exc}"))
+                append_line(f"Error: {exc}")
             finally:
-                ui(lambda: set_enabled(True))
+                ui(set_enabled, True)
 
-        threading.Thread(target=worker, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(worker(), loop)
 
     send_button = tk.Button(input_frame, text="Send", command=send_text)
     send_button.pack(side="left", padx=(8, 0))
@@ -199,8 +707,18 @@ def run_gui(assistant: BMOAssistant) -> None:
     speak_button = tk.Button(input_frame, text="Speak", command=speak)
     speak_button.pack(side="left", padx=(8, 0))
 
+    def on_close() -> None:
+        try:
+            asyncio.run_coroutine_threadsafe(assistant.aclose(), loop).result(timeout=5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
     user_entry.bind("<Return>", lambda _event: send_text())
     append_line("BMO: Ready")
+    flush_output()
     root.mainloop()
 #main
 def parse_args() -> argparse.Namespace:
@@ -216,7 +734,7 @@ def main() -> None:
     if args.mode == "gui":
         run_gui(assistant)
     else:
-        run_cli(assistant)
+        asyncio.run(run_cli(assistant))
 
 
 if __name__ == "__main__":